@@ -1,9 +1,24 @@
+import os
+
 from setuptools import setup, find_packages
 
+# core.py runs on every Waybar tick, so compile it with mypyc when it is
+# available at build time. Without mypy installed (or with
+# WAYBAR_POMODORO_NO_MYPYC=1) the pure-Python module is used instead.
+ext_modules = []
+if not os.environ.get("WAYBAR_POMODORO_NO_MYPYC"):
+    try:
+        from mypyc.build import mypycify
+    except ImportError:
+        pass
+    else:
+        ext_modules = mypycify(['waybar_pomodoro/core.py'])
+
 setup(
     name="waybar-pomodoro",
     version="1.0.0",
     packages=find_packages(),
+    ext_modules=ext_modules,
     author="Your Name",
     author_email="your@email.com",
     description="A simple pomodoro timer for Waybar",
@@ -15,7 +30,7 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     # This is the most important part:
     # It creates a command-line script 'waybar-pomodoro'
     # that runs the 'main' function from 'waybar_pomodoro/main.py'
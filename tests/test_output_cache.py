@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from waybar_pomodoro import core, main
+from waybar_pomodoro.core import PomodoroState, SessionType, TimerState
+
+
+class OutputCacheTest(unittest.TestCase):
+    """Runs main() in-process against a temporary state file."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        state_file = os.path.join(tmp.name, "pomodoro_state.json")
+        self.cache_file = state_file + ".out"
+        for target, attr, value in (
+            (core, "STATE_FILE", state_file),
+            (core, "OUTPUT_CACHE_FILE", self.cache_file),
+            (main, "SOCKET_PATH", os.path.join(tmp.name, "missing.sock")),
+        ):
+            patcher = mock.patch.object(target, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_main(self, command="status"):
+        """Runs one invocation and returns what it wrote to stdout."""
+        with tempfile.TemporaryFile() as out, \
+                mock.patch.object(sys, "argv", ["waybar-pomodoro", command]):
+            saved_stdout = os.dup(1)
+            os.dup2(out.fileno(), 1)
+            try:
+                main.main()
+            finally:
+                os.dup2(saved_stdout, 1)
+                os.close(saved_stdout)
+            out.seek(0)
+            return out.read().decode()
+
+    def test_concurrent_write_is_not_cached_under_new_stamp(self):
+        core.save_state(PomodoroState(TimerState.PAUSED, SessionType.WORK, remaining_secs=2699))
+        resumed = PomodoroState(TimerState.RUNNING, SessionType.WORK,
+                                end_time=core.time.time() + 2699, remaining_secs=2699)
+
+        real_load = core.StateFile.load
+
+        def load_then_toggle(sf):
+            # Another process resumes the timer right after this tick's read
+            state = real_load(sf)
+            core.save_state(resumed)
+            return state
+
+        with mock.patch.object(core.StateFile, "load", load_then_toggle):
+            self.assertIn("Paused", self.run_main())
+
+        self.assertIn("Click to pause", self.run_main())
+
+    def test_running_entry_expires_when_display_changes(self):
+        now = 1000.0
+        core.save_state(PomodoroState(TimerState.RUNNING, SessionType.WORK,
+                                      end_time=now + 10.5, remaining_secs=10.5))
+
+        with mock.patch("time.time", return_value=now):
+            self.assertIn("00:10", self.run_main())
+        with open(self.cache_file, "rb") as f:
+            cached = f.read()
+
+        with mock.patch("time.time", return_value=now + 0.4):
+            self.assertIn("00:10", self.run_main())
+        with mock.patch("time.time", return_value=now + 0.6):
+            self.assertIn("00:09", self.run_main())
+
+        # An expired entry for the same stamp is not rewritten every tick
+        with open(self.cache_file, "rb") as f:
+            self.assertEqual(f.read(), cached)
+
+        with mock.patch("time.time", return_value=now + 10.5):
+            self.assertIn("finished", self.run_main())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from waybar_pomodoro import core
+from waybar_pomodoro.core import TimerState
+
+
+class CorruptStateFileTest(unittest.TestCase):
+    """A corrupt state file must fall back to a stopped state, compiled or not."""
+
+    CORRUPT_CONTENTS = (b"[]", b"123", b'"text"', b"null", b"{", b'{"state": 1}',
+                        b'{"state": "RUNNING", "session_type": "WORK", "end_time": "x"}')
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.state_file = os.path.join(tmp.name, "pomodoro_state.json")
+        patcher = mock.patch.object(core, "STATE_FILE", self.state_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, raw):
+        with open(self.state_file, "wb") as f:
+            f.write(raw)
+
+    def test_load_state_falls_back_to_stopped(self):
+        for raw in self.CORRUPT_CONTENTS:
+            with self.subTest(raw=raw):
+                self.write(raw)
+                self.assertEqual(core.load_state().state, TimerState.STOPPED)
+
+    def test_state_file_load_falls_back_to_stopped(self):
+        for raw in self.CORRUPT_CONTENTS:
+            with self.subTest(raw=raw):
+                self.write(raw)
+                with core.StateFile() as sf:
+                    state = sf.load()
+                    self.assertEqual(state.state, TimerState.STOPPED)
+                    # Commands still work, so the file repairs itself
+                    sf.save(core.cycle_state(state))
+                self.assertEqual(core.load_state().state, TimerState.RUNNING)
+
+
+if __name__ == "__main__":
+    unittest.main()
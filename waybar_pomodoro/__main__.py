@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+"""
+Runs the timer as `python -m waybar_pomodoro`, or by path with site
+initialization disabled for the fastest startup:
+
+    python3 -I -S /path/to/waybar_pomodoro/__main__.py [command]
+"""
+
+import sys
+
+if not __package__:
+    # Run by path: -I/-S leave both the script directory and site-packages
+    # off sys.path, so add the directory that contains this package
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from waybar_pomodoro.main import main
+
+main()
@@ -1,10 +1,17 @@
 #!/usr/bin/env python
 
+from __future__ import annotations
+
 import json
 import os
 import sys
-from datetime import datetime, timedelta
-from enum import Enum, auto
+import time
+from types import SimpleNamespace
+
+# typing is only needed by type checkers; keep it off the per-tick import path
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Optional
 
 # --- Configuration ---
 # You can adjust these timers (in minutes)
@@ -15,94 +22,260 @@ SESSIONS_PER_CYCLE = 4  # Number of work sessions before a long break
 
 STATE_FILE = os.path.expanduser("~/.cache/pomodoro_state.json")
 
-# --- Enums for State Management ---
+# --- State Constants ---
+# Plain strings rather than Enums: they are stored in the state file as-is
+# and compare with a simple string comparison.
 
-class SessionType(Enum):
-    """Defines the type of session."""
-    WORK = "WORK"
-    SHORT_BREAK = "SHORT BREAK"
-    LONG_BREAK = "LONG BREAK"
+SessionType = SimpleNamespace(
+    WORK="WORK",
+    SHORT_BREAK="SHORT BREAK",
+    LONG_BREAK="LONG BREAK",
+)
 
-    def __str__(self):
-        return self.value
+TimerState = SimpleNamespace(
+    STOPPED="STOPPED",
+    RUNNING="RUNNING",
+    PAUSED="PAUSED",
+    FINISHED="FINISHED",
+)
 
-class TimerState(Enum):
-    """Defines the current running state of the timer."""
-    STOPPED = auto()
-    RUNNING = auto()
-    PAUSED = auto()
-    FINISHED = auto()
+_TIMER_STATES = frozenset(vars(TimerState).values())
+# Also accept the Enum member names written by older versions
+_SESSION_TYPES = {value: value for value in vars(SessionType).values()}
+_SESSION_TYPES.update({name: value for name, value in vars(SessionType).items()})
 
 # --- State Data Class ---
 
 class PomodoroState:
     """A simple class to hold and (de)serialize the timer state."""
+
+    __slots__ = ("state", "session_type", "end_time", "remaining_secs", "work_sessions")
     
-    def __init__(self, state: TimerState, session_type: SessionType, end_time: datetime = None, 
+    def __init__(self, state: str, session_type: str, end_time: Optional[float] = None, 
                  remaining_secs: float = 0, work_sessions: int = 0):
         self.state = state
         self.session_type = session_type
-        self.end_time = end_time
+        self.end_time = end_time # Unix timestamp (seconds) when the session ends
         self.remaining_secs = remaining_secs
         self.work_sessions = work_sessions # Tracks sessions completed in this cycle
 
-    def to_dict(self):
+    def to_dict(self) -> dict:
         """Serialize to a dictionary for JSON storage."""
         return {
-            "state": self.state.name,
-            "session_type": self.session_type.name,
-            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "state": self.state,
+            "session_type": self.session_type,
+            "end_time": self.end_time,
             "remaining_secs": self.remaining_secs,
             "work_sessions": self.work_sessions,
         }
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data: Any) -> "PomodoroState":
         """Deserialize from a dictionary."""
         try:
-            state = TimerState[data["state"]]
-            session_type = SessionType[data["session_type"]]
-            end_time = datetime.fromisoformat(data["end_time"]) if data["end_time"] else None
+            state = data["state"]
+            if state not in _TIMER_STATES:
+                return cls.stopped()
+            session_type = _SESSION_TYPES[data["session_type"]]
+            end_time = float(data["end_time"]) if data["end_time"] is not None else None
             remaining_secs = float(data.get("remaining_secs", 0))
             work_sessions = int(data.get("work_sessions", 0))
             
             return cls(state, session_type, end_time, remaining_secs, work_sessions)
-        except (KeyError, TypeError):
+        except (KeyError, TypeError, ValueError):
             # If state file is corrupt or old, return a clean state
             return cls.stopped()
 
     @classmethod
-    def stopped(cls):
+    def stopped(cls) -> "PomodoroState":
         """Returns a default, stopped state."""
         return cls(TimerState.STOPPED, SessionType.WORK, work_sessions=0)
 
 # --- State File Handling ---
 
+_O_NOATIME = getattr(os, "O_NOATIME", 0)  # Linux only
+
+def dumps_json(data: Any) -> bytes:
+    """Serialize to JSON bytes."""
+    return json.dumps(data).encode()
+
+def _parse_state(raw: bytes) -> PomodoroState:
+    """Parses raw state file contents, falling back to a stopped state."""
+    if not raw:
+        return PomodoroState.stopped()
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        # On corrupt file, return a default state
+        return PomodoroState.stopped()
+    if not isinstance(data, dict):
+        # Valid JSON, but not a state object
+        return PomodoroState.stopped()
+    return PomodoroState.from_dict(data)
+
+def _open_noatime(path: str, flags: int, mode: int = 0o644) -> int:
+    """Opens a file without updating its access time where supported."""
+    if _O_NOATIME:
+        try:
+            return os.open(path, flags | _O_NOATIME, mode)
+        except PermissionError:
+            # O_NOATIME is only allowed on files we own
+            pass
+    return os.open(path, flags, mode)
+
 def load_state() -> PomodoroState:
     """Loads the timer state from the JSON file."""
-    if not os.path.exists(STATE_FILE):
+    try:
+        fd = _open_noatime(STATE_FILE, os.O_RDONLY)
+    except OSError:
+        # Covers FileNotFoundError on the first run
         return PomodoroState.stopped()
-        
+
     try:
-        with open(STATE_FILE, 'r') as f:
-            data = json.load(f)
-            return PomodoroState.from_dict(data)
-    except (json.JSONDecodeError, IOError):
-        # On corrupt file, return a default state
+        return _parse_state(os.read(fd, 4096))
+    except OSError:
         return PomodoroState.stopped()
+    finally:
+        os.close(fd)
+
+def _open_creating_dir(path: str, flags: int) -> int:
+    """
+    Opens (and creates) a file in the cache directory. The directory is
+    only created if the open fails, so it costs nothing once it exists.
+    """
+    try:
+        return _open_noatime(path, flags)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return _open_noatime(path, flags)
 
 def save_state(state: PomodoroState):
     """Saves the current timer state to the JSON file."""
     try:
-        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state.to_dict(), f)
-    except IOError as e:
+        fd = _open_creating_dir(STATE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        try:
+            os.write(fd, dumps_json(state.to_dict()))
+        finally:
+            os.close(fd)
+    except OSError as e:
         print(f"Error saving state: {e}", file=sys.stderr)
 
+class StateFile:
+    """
+    Keeps the state file open across a single load/modify/save cycle,
+    so one descriptor serves both the read and the write.
+
+        with StateFile() as sf:
+            state = sf.load()
+            ...
+            sf.save(state)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or STATE_FILE
+        self.fd = -1
+
+    def __enter__(self) -> "StateFile":
+        self.fd = _open_creating_dir(self.path, os.O_RDWR | os.O_CREAT)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def load(self) -> PomodoroState:
+        """Reads the state from the open file."""
+        try:
+            return _parse_state(os.read(self.fd, 4096))
+        except OSError:
+            return PomodoroState.stopped()
+
+    def save(self, state: PomodoroState):
+        """Replaces the file contents with the given state."""
+        try:
+            payload = dumps_json(state.to_dict())
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            os.ftruncate(self.fd, 0)
+            os.write(self.fd, payload)
+        except OSError as e:
+            print(f"Error saving state: {e}", file=sys.stderr)
+
+    def stamp(self) -> tuple:
+        """Returns (mtime_ns, size) of the open file, used to key the output cache."""
+        st = os.fstat(self.fd)
+        return (st.st_mtime_ns, st.st_size)
+
+# --- Output Cache ---
+# The last output line is kept next to the state file, keyed on the state
+# file's stamp. A status tick that finds a matching, unexpired entry writes
+# it out without parsing the state. Each stamp is cached at most once, so a
+# running timer (whose entry expires within a second) does not rewrite the
+# cache on every tick.
+#
+# File layout: b"<mtime_ns> <size> <valid_until> <length>\n<line>", where
+# valid_until is the time the displayed MM:SS changes, or -1 when the
+# output does not depend on the clock.
+
+OUTPUT_CACHE_FILE = STATE_FILE + ".out"
+
+def load_cached_output(stamp: tuple, path: Optional[str] = None) -> tuple:
+    """
+    Looks up the cached output for the given state file stamp.
+    Returns (line, has_entry): line is None unless the entry is still
+    valid, and has_entry tells whether an entry exists for this stamp at all.
+    """
+    try:
+        fd = _open_noatime(path or OUTPUT_CACHE_FILE, os.O_RDONLY)
+    except OSError:
+        return None, False
+    try:
+        raw = os.read(fd, 4096)
+    except OSError:
+        return None, False
+    finally:
+        os.close(fd)
+
+    header, sep, line = raw.partition(b"\n")
+    fields = header.split()
+    if not sep or len(fields) != 4:
+        return None, False
+    try:
+        mtime_ns, size, length = int(fields[0]), int(fields[1]), int(fields[3])
+        valid_until = float(fields[2])
+    except ValueError:
+        return None, False
+
+    if (mtime_ns, size) != stamp or length != len(line):
+        return None, False
+    if valid_until != -1 and time.time() >= valid_until:
+        return None, True
+    return line, True
+
+def save_cached_output(stamp: tuple, state: PomodoroState, line: bytes, now: float,
+                       path: Optional[str] = None):
+    """
+    Stores the output line for the given state file stamp. now must be
+    taken before the output was computed, so the expiry errs early.
+    """
+    valid_until = -1.0
+    if state.state == TimerState.RUNNING and state.end_time is not None:
+        # The display shows int(end_time - now), which next drops at end_time - k
+        valid_until = state.end_time - max(0, int(state.end_time - now))
+    header = f"{stamp[0]} {stamp[1]} {valid_until!r} {len(line)}\n".encode()
+    try:
+        fd = os.open(path or OUTPUT_CACHE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, header + line)
+        finally:
+            os.close(fd)
+    except OSError:
+        # The cache is only an optimization
+        pass
+
 # --- Core Timer Logic ---
 
-def get_session_duration_secs(session_type: SessionType) -> int:
+def get_session_duration_secs(session_type: str) -> int:
     """Returns the duration of a session in seconds."""
     if session_type == SessionType.WORK:
         return WORK_MINS * 60
@@ -112,27 +285,39 @@ def get_session_duration_secs(session_type: SessionType) -> int:
         return LONG_BREAK_MINS * 60
     return 0 # Should not happen
 
-def start_session(session_type: SessionType, work_sessions: int) -> PomodoroState:
-    """Starts a new session of the given type."""
-    now = datetime.now()
+def start_session(session_type: str, work_sessions: int,
+                  state: Optional[PomodoroState] = None) -> PomodoroState:
+    """
+    Starts a new session of the given type.
+    If a state is given it is updated in place and returned.
+    """
+    now = time.time()
     duration_secs = get_session_duration_secs(session_type)
-    end_time = now + timedelta(seconds=duration_secs)
+    end_time = now + duration_secs
     
-    return PomodoroState(
-        state=TimerState.RUNNING,
-        session_type=session_type,
-        end_time=end_time,
-        remaining_secs=duration_secs,
-        work_sessions=work_sessions
-    )
+    if state is None:
+        return PomodoroState(
+            state=TimerState.RUNNING,
+            session_type=session_type,
+            end_time=end_time,
+            remaining_secs=duration_secs,
+            work_sessions=work_sessions
+        )
+
+    state.state = TimerState.RUNNING
+    state.session_type = session_type
+    state.end_time = end_time
+    state.remaining_secs = float(duration_secs)
+    state.work_sessions = work_sessions
+    return state
 
 def toggle_pause(state: PomodoroState) -> PomodoroState:
     """Toggles the pause state of the timer."""
-    now = datetime.now()
+    now = time.time()
     
-    if state.state == TimerState.RUNNING:
+    if state.state == TimerState.RUNNING and state.end_time is not None:
         # PAUSE: Calculate remaining time and store it
-        remaining = (state.end_time - now).total_seconds()
+        remaining = state.end_time - now
         state.state = TimerState.PAUSED
         state.remaining_secs = remaining
         state.end_time = None # Clear end_time as it's no longer valid
@@ -140,96 +325,142 @@ def toggle_pause(state: PomodoroState) -> PomodoroState:
     elif state.state == TimerState.PAUSED:
         # RESUME: Calculate new end_time from remaining seconds
         state.state = TimerState.RUNNING
-        state.end_time = now + timedelta(seconds=state.remaining_secs)
+        state.end_time = now + state.remaining_secs
         # remaining_secs is kept as is until the next pause
     
     return state
 
-def stop_timer() -> PomodoroState:
-    """Stops the timer and resets to the default state."""
-    return PomodoroState.stopped()
+def stop_timer(state: Optional[PomodoroState] = None) -> PomodoroState:
+    """
+    Stops the timer and resets to the default state.
+    If a state is given it is reset in place and returned.
+    """
+    if state is None:
+        return PomodoroState.stopped()
+
+    state.state = TimerState.STOPPED
+    state.session_type = SessionType.WORK
+    state.end_time = None
+    state.remaining_secs = 0.0
+    state.work_sessions = 0
+    return state
+
+# Session that follows a finished work session, keyed by whether it
+# completes a cycle; every break is followed by work
+_NEXT_AFTER_WORK = {True: SessionType.LONG_BREAK, False: SessionType.SHORT_BREAK}
+_NEXT_AFTER_BREAK = SessionType.WORK
+
+def next_session_type(state: PomodoroState) -> str:
+    """Returns the session type that follows the state's current session."""
+    if state.session_type == SessionType.WORK:
+        return _NEXT_AFTER_WORK[(state.work_sessions + 1) % SESSIONS_PER_CYCLE == 0]
+    return _NEXT_AFTER_BREAK
 
 def cycle_state(state: PomodoroState) -> PomodoroState:
     """
-    Cycles to the next logical state.
+    Cycles to the next logical state, updating the state in place.
     Called on right-click ("cycle")
     """
     
-    if state.state in [TimerState.RUNNING, TimerState.PAUSED]:
+    if state.state in (TimerState.RUNNING, TimerState.PAUSED):
         # If timer is running or paused, just stop it
-        return stop_timer()
+        return stop_timer(state)
 
     if state.state == TimerState.STOPPED:
         # Start the first work session
-        return start_session(SessionType.WORK, 0)
+        return start_session(SessionType.WORK, 0, state)
     
     if state.state == TimerState.FINISHED:
         # The previous session finished, start the next one
+        nxt = next_session_type(state)
         
         if state.session_type == SessionType.WORK:
-            # Work finished, check if it's time for a long break
-            if (state.work_sessions + 1) % SESSIONS_PER_CYCLE == 0:
-                return start_session(SessionType.LONG_BREAK, state.work_sessions + 1)
-            else:
-                return start_session(SessionType.SHORT_BREAK, state.work_sessions + 1)
-        
-        elif state.session_type == SessionType.SHORT_BREAK:
-            # Short break finished, start next work session
-            return start_session(SessionType.WORK, state.work_sessions)
+            # Work finished, count it towards the cycle
+            return start_session(nxt, state.work_sessions + 1, state)
         
-        elif state.session_type == SessionType.LONG_BREAK:
-            # Long break finished, reset cycle and start work
-            # We reset the work_sessions counter to 0
-            return start_session(SessionType.WORK, 0)
+        # A long break ends the cycle, so reset the work_sessions counter
+        work_sessions = 0 if state.session_type == SessionType.LONG_BREAK else state.work_sessions
+        return start_session(nxt, work_sessions, state)
             
     return state # Should not be reached, but good practice
 
 # --- Output Generation ---
 
-def get_output(state: PomodoroState) -> dict:
+# Icons, written as escapes so the source stays ASCII
+_ICON_WORK = "\U0001F345"      # tomato
+_ICON_BREAK = "\u2615"         # hot beverage
+_ICON_PAUSE = "\u23F8\uFE0F"   # pause button (emoji presentation)
+_ICON_FINISHED = "\U0001F389"  # party popper
+
+# Outputs that do not depend on the clock are built once at import time.
+# Callers must treat the returned dicts as read-only.
+_STOPPED_OUTPUT = {
+    "text": _ICON_WORK,
+    "tooltip": "Pomodoro Stopped\nRight-click to start work.",
+    "class": "stopped"
+}
+
+# "MM:SS" strings for every whole second a session can last
+_MMSS = tuple(
+    f"{sec // 60:02d}:{sec % 60:02d}"
+    for sec in range(max(WORK_MINS, SHORT_BREAK_MINS, LONG_BREAK_MINS) * 60 + 1)
+)
+
+def _format_mmss(secs: float) -> str:
+    """Formats a number of seconds as MM:SS."""
+    whole = max(0, int(secs))
+    if whole < len(_MMSS):
+        return _MMSS[whole]
+    # Only reachable if the durations were shortened mid-session
+    mins, rem = divmod(whole, 60)
+    return f"{mins:02d}:{rem:02d}"
+
+# Keyed by (finished session type, next session type)
+_FINISHED_OUTPUTS = {
+    (finished, upcoming): {
+        "text": f"{_ICON_FINISHED} 00:00",
+        "tooltip": f"{finished} finished!\nRight-click to start {upcoming}.",
+        "class": "finished"
+    }
+    for finished, upcoming in (
+        (SessionType.WORK, SessionType.SHORT_BREAK),
+        (SessionType.WORK, SessionType.LONG_BREAK),
+        (SessionType.SHORT_BREAK, SessionType.WORK),
+        (SessionType.LONG_BREAK, SessionType.WORK),
+    )
+}
+
+def get_output(state: PomodoroState) -> tuple:
     """
-    Checks and updates the state, then returns a JSON dict for Waybar.
+    Checks and updates the state, then builds the Waybar output.
+    Returns (output_dict, mutated), where mutated is True only when the
+    timer just finished and the state therefore needs saving.
     """
-    now = datetime.now()
+    now = time.time()
+    mutated = False
     
     # 1. Check for timer completion
     if state.state == TimerState.RUNNING and state.end_time and now >= state.end_time:
         state.state = TimerState.FINISHED
         state.end_time = None
-        state.remaining_secs = 0
+        state.remaining_secs = 0.0
+        mutated = True
 
     # 2. Format output based on the (potentially updated) state
+    return _build_output(state, now), mutated
+
+def _build_output(state: PomodoroState, now: float) -> dict:
+    """Builds the Waybar output dict for an already up-to-date state."""
     if state.state == TimerState.STOPPED:
-        return {
-            "text": "🍅",
-            "tooltip": "Pomodoro Stopped\nRight-click to start work.",
-            "class": "stopped"
-        }
+        return _STOPPED_OUTPUT
 
     elif state.state == TimerState.FINISHED:
-        next_session_type = ""
-        if state.session_type == SessionType.WORK:
-            if (state.work_sessions + 1) % SESSIONS_PER_CYCLE == 0:
-                next_session_type = SessionType.LONG_BREAK
-            else:
-                next_session_type = SessionType.SHORT_BREAK
-        
-        elif state.session_type == SessionType.SHORT_BREAK:
-            next_session_type = SessionType.WORK
-        elif state.session_type == SessionType.LONG_BREAK:
-            next_session_type = SessionType.WORK
-        
-        return {
-            "text": "🎉 00:00",
-            "tooltip": f"{state.session_type} finished!\nRight-click to start {next_session_type}.",
-            "class": "finished"
-        }
+        return _FINISHED_OUTPUTS[(state.session_type, next_session_type(state))]
 
     elif state.state == TimerState.PAUSED:
         # Show the time that was remaining when pause was hit
-        icon = "⏸️"
-        mins, secs = divmod(int(state.remaining_secs), 60)
-        time_str = f"{mins:02d}:{secs:02d}"
+        icon = _ICON_PAUSE
+        time_str = _format_mmss(state.remaining_secs)
         tooltip = f"Paused: {state.session_type}\nClick to resume."
         css_class = "paused"
         
@@ -239,16 +470,11 @@ def get_output(state: PomodoroState) -> dict:
             "class": css_class
         }
 
-    elif state.state == TimerState.RUNNING:
+    elif state.state == TimerState.RUNNING and state.end_time is not None:
         # Calculate and show remaining time
-        icon = "🍅" if state.session_type == SessionType.WORK else "☕"
-        remaining = (state.end_time - now).total_seconds()
-        
-        # Ensure it doesn't go below zero before the next tick
-        remaining = max(0, remaining) 
-        
-        mins, secs = divmod(int(remaining), 60)
-        time_str = f"{mins:02d}:{secs:02d}"
+        icon = _ICON_WORK if state.session_type == SessionType.WORK else _ICON_BREAK
+        # _format_mmss clamps at zero in case we are just past the end
+        time_str = _format_mmss(state.end_time - now)
         tooltip = f"{state.session_type}\nClick to pause."
         css_class = "work" if state.session_type == SessionType.WORK else "break"
 
@@ -260,3 +486,16 @@ def get_output(state: PomodoroState) -> dict:
 
     return {} # Fallback
 
+# Encoded lines for the precomputed outputs, keyed by identity
+_STATIC_OUTPUT_LINES = {
+    id(output): dumps_json(output) + b"\n"
+    for output in (_STOPPED_OUTPUT, *_FINISHED_OUTPUTS.values())
+}
+
+def encode_output(output: dict) -> bytes:
+    """Encodes a Waybar output dict as a newline-terminated JSON line."""
+    line = _STATIC_OUTPUT_LINES.get(id(output))
+    if line is None:
+        line = dumps_json(output) + b"\n"
+    return line
+
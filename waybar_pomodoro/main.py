@@ -1,76 +1,280 @@
 #!/usr/bin/env python
 
 import sys
-import json
+import atexit
 import os
+import stat
+import time
 from waybar_pomodoro.core import (
+    StateFile,
     load_state,
     save_state,
+    encode_output,
+    load_cached_output,
+    save_cached_output,
     toggle_pause,
     stop_timer,
     cycle_state,
     get_output,
-    STATE_FILE
 )
-from datetime import datetime
-import traceback # Import traceback for error logging
 
 # --- Simple Logger ---
+# Logging is opt-in: set WAYBAR_POMODORO_DEBUG=1 to enable it.
 LOG_FILE = os.path.expanduser("~/.cache/pomodoro.log")
+_DEBUG = os.environ.get("WAYBAR_POMODORO_DEBUG") == "1"
+_log_buf = []  # type: list[str]
+_log_ts = ""
+
+def start_log_entry():
+    """Sets the timestamp shared by all messages logged for one run or request."""
+    global _log_ts
+    if _DEBUG:
+        _log_ts = time.strftime("[%Y-%m-%d %H:%M:%S] ")
+
 def log_message(msg):
-    """Appends a timestamped message to the log file."""
+    """Buffers a timestamped message for the log file."""
+    if not _DEBUG:
+        return
+    _log_buf.append(_log_ts + msg + "\n")
+
+def _flush_log():
+    """Appends all buffered messages to the log file in a single write."""
+    if not _log_buf:
+        return
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
     try:
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-        with open(LOG_FILE, "a") as f:
-            f.write(f"[{datetime.now()}] {msg}\n")
-    except Exception as e:
+        try:
+            fd = os.open(LOG_FILE, flags, 0o644)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            fd = os.open(LOG_FILE, flags, 0o644)
+        try:
+            os.write(fd, "".join(_log_buf).encode())
+        finally:
+            os.close(fd)
+    except OSError:
         # If logging fails, we can't do much.
-        pass 
+        pass
+    _log_buf.clear()
+
+if _DEBUG:
+    atexit.register(_flush_log)
+
+# --- Daemon Socket ---
+# With a daemon running, each Waybar tick is a socket round-trip instead of
+# a full load/compute/save cycle.
+SOCKET_PATH = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/waybar-pomodoro-{os.getuid()}",
+    "waybar-pomodoro.sock",
+)
+CLIENT_TIMEOUT_SECS = 1.0
+# Commands that change the state; anything else is treated as "status"
+STATE_COMMANDS = ("toggle", "stop", "cycle")
+
+_ICON_ERROR = "\u26A0\uFE0F"  # warning sign (emoji presentation)
+
+def make_error_output(e) -> dict:
+    """Returns a minimal error output for Waybar."""
+    return {"text": _ICON_ERROR, "tooltip": f"Pomodoro Error: {e}", "class": "error"}
+
+def apply_command(state, command):
+    """
+    Applies a command to the state.
+    Returns the (possibly new) state, the Waybar output dict, and whether
+    the state changed and needs saving.
+    """
+    if command == "toggle":
+        state = toggle_pause(state)
+        log_message(f"State after 'toggle': {state.state}")
+    elif command == "stop":
+        state = stop_timer(state)
+        log_message("State after 'stop'")
+    elif command == "cycle":
+        state = cycle_state(state)
+        log_message(f"State after 'cycle': {state.state}, Session: {state.session_type}")
+    # "status" command just updates and returns the output
+
+    output_dict, mutated = get_output(state)
+    log_message(f"Generated output. New state: {state.state}")
+    return state, output_dict, mutated or command in STATE_COMMANDS
+
+def _is_private_dir(path):
+    """Checks that path is a real directory owned by us that nobody else can access."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return (stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid()
+            and stat.S_IMODE(st.st_mode) & 0o077 == 0)
+
+def query_daemon(command):
+    """
+    Sends a command to the daemon and returns its raw JSON reply,
+    or None if no daemon is running.
+    Other errors (e.g. a timeout) are raised rather than falling back,
+    since the daemon may already have applied the command.
+    """
+    # The common case: no daemon, so don't pay for importing socket
+    if not os.path.exists(SOCKET_PATH):
+        return None
+    if not _is_private_dir(os.path.dirname(SOCKET_PATH)):
+        # Someone else could have planted this socket; don't trust it
+        log_message(f"Ignoring {SOCKET_PATH}: its directory is not private")
+        return None
+
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CLIENT_TIMEOUT_SECS)
+        try:
+            sock.connect(SOCKET_PATH)
+        except (FileNotFoundError, ConnectionRefusedError):
+            # Stale socket left behind by a daemon that is gone
+            return None
+        sock.sendall(command.encode())
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    reply = b"".join(chunks)
+    if not reply:
+        raise ConnectionError("Empty reply from the daemon")
+    return reply
+
+def _bind_socket():
+    """Creates the listening socket, replacing a stale one if needed."""
+    import socket
+
+    socket_dir = os.path.dirname(SOCKET_PATH)
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    if not _is_private_dir(socket_dir):
+        raise SystemExit(f"Refusing to use {socket_dir}: it must be a directory "
+                         "owned by you with mode 0700")
+
+    if os.path.exists(SOCKET_PATH):
+        try:
+            running = query_daemon("status") is not None
+        except OSError:
+            # Something is listening but not answering properly; leave it alone
+            running = True
+        if running:
+            raise SystemExit(f"A daemon is already listening on {SOCKET_PATH}")
+        os.unlink(SOCKET_PATH)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(SOCKET_PATH)
+    os.chmod(SOCKET_PATH, 0o600)
+    server.listen()
+    return server
+
+def run_daemon():
+    """
+    Holds the timer state in memory and serves commands over SOCKET_PATH.
+    The state file is only written when the state changes.
+    """
+    import signal
+
+    # Turn SIGTERM (e.g. from systemd) into a normal exit so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    server = _bind_socket()
+    state = load_state()
+    start_log_entry()
+    log_message(f"Daemon started on {SOCKET_PATH}. State: {state.state}")
+    _flush_log()
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            start_log_entry()
+            with conn:
+                try:
+                    conn.settimeout(CLIENT_TIMEOUT_SECS)
+                    command = conn.recv(64).decode().strip() or "status"
+                    state, output_dict, changed = apply_command(state, command)
+                    if changed:
+                        save_state(state)
+                    conn.sendall(encode_output(output_dict))
+                except Exception as e:
+                    log_message(f"Daemon request failed: {e}")
+                    try:
+                        conn.sendall(encode_output(make_error_output(e)))
+                    except OSError:
+                        pass
+            _flush_log()
+    finally:
+        server.close()
+        try:
+            os.unlink(SOCKET_PATH)
+        except FileNotFoundError:
+            pass
 
 # Renamed this function from 'run' back to 'main'
 def main():
     """
     Main entry point for the pipx command.
     """
+    if sys.argv[1:2] == ["--daemon"]:
+        run_daemon()
+        return
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    start_log_entry()
     try:
-        # Ensure cache directory exists before trying to load
-        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        reply = query_daemon(command)
+        if reply is not None:
+            os.write(1, reply)
+            return
+
+        # No daemon: load, update, and save the state in this process
         log_message(f"Script started. Command: {sys.argv[1:]}")
         
-        state = load_state()
-        log_message(f"Loaded state: {state.state.name}, Session: {state.session_type.name}")
-        
-        command = sys.argv[1] if len(sys.argv) > 1 else "status"
-
-        if command == "toggle":
-            state = toggle_pause(state)
-            log_message(f"State after 'toggle': {state.state.name}")
-        elif command == "stop":
-            state = stop_timer()
-            log_message("State after 'stop'")
-        elif command == "cycle":
-            state = cycle_state(state)
-            log_message(f"State after 'cycle': {state.state.name}, Session: {state.session_type.name}")
-        # "status" command just loads, updates, and prints
-
-        output_dict = get_output(state)
-        log_message(f"Generated output. New state: {state.state.name}")
-        
-        save_state(state)
-        log_message("State saved.")
+        with StateFile() as sf:
+            # Stamp before reading, so a concurrent write can only make the
+            # cache key older than the contents, never newer
+            stamp = sf.stamp()
+            cached = False
+            if command not in STATE_COMMANDS:
+                line, cached = load_cached_output(stamp)
+                if line is not None:
+                    os.write(1, line)
+                    log_message("Served cached output.")
+                    return
+
+            now = time.time()
+            state = sf.load()
+            log_message(f"Loaded state: {state.state}, Session: {state.session_type}")
+
+            state, output_dict, changed = apply_command(state, command)
+            
+            # A plain "status" tick usually changes nothing, so skip the write
+            if changed:
+                sf.save(state)
+                stamp = sf.stamp()
+                cached = False
+                log_message("State saved.")
+
+            line = encode_output(output_dict)
+            if not cached:
+                save_cached_output(stamp, state, line, now)
         
-        print(json.dumps(output_dict))
+        # Write the bytes straight to stdout, bypassing the text layer
+        os.write(1, line)
         log_message("Output printed.")
         log_message("-" * 20) # Add a separator
 
     except Exception as e:
+        # Cold-path import, kept out of the normal tick
+        import traceback
         log_message(f"--- SCRIPT FAILED ---")
         log_message(f"Error: {e}")
         log_message(f"Traceback: {traceback.format_exc()}")
         # Still try to print a minimal error for Waybar
-        print(json.dumps({"text": "⚠️", "tooltip": f"Pomodoro Error: {e}", "class": "error"}))
+        os.write(1, encode_output(make_error_output(e)))
 
 if __name__ == "__main__":
     main()
-